@@ -1,11 +1,16 @@
 """Configuration for the LLM Council."""
 
 import os
-import json
+import orjson
 from pathlib import Path
-from dotenv import load_dotenv
+from typing import Sequence
 
-load_dotenv()
+# Load the project's .env (API keys, cache and concurrency settings, CLI auth
+# variables) if there is one; variables already exported take precedence
+_ENV_FILE = Path(__file__).resolve().parent.parent / ".env"
+if _ENV_FILE.is_file():
+    from dotenv import load_dotenv
+    load_dotenv(_ENV_FILE)
 
 # API Keys for different providers
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
@@ -17,15 +22,26 @@ OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
 ANTHROPIC_API_URL = "https://api.anthropic.com/v1/messages"
 
+# Most in-flight queries allowed per route (openai, anthropic, openrouter, cli)
+MAX_CONCURRENT_REQUESTS_PER_PROVIDER = int(os.getenv("MAX_CONCURRENT_REQUESTS_PER_PROVIDER", "10"))
+
+# Exact-match response cache for model queries (off by default)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "").lower() in ("1", "true", "yes")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_MAX_ENTRIES = 1024
+# CLI answers cost a process spawn, so they get their own longer-lived cache
+CLI_CACHE_TTL = float(os.getenv("CLI_CACHE_TTL", "86400"))
+CLI_CACHE_MAX_ENTRIES = 256
+
 # Data directory for storage
 DATA_DIR = "data/conversations"
 CONFIG_FILE = "data/council_config.json"
 
 # Default council configuration
-DEFAULT_COUNCIL_MODELS = [
+DEFAULT_COUNCIL_MODELS: tuple[str, ...] = (
     "cli:codex",
     "cli:gemini",
-]
+)
 DEFAULT_CHAIRMAN_MODEL = "anthropic/claude-opus-4-5-20251101"
 
 
@@ -34,28 +50,46 @@ def _ensure_config_dir():
     Path("data").mkdir(exist_ok=True)
 
 
+# Parsed council config, keyed on the config file's mtime so steady-state
+# reads cost a single stat() instead of an open + JSON parse.
+_config_cache = {"mtime_ns": -1, "models": None, "chairman": None}
+
+
 def load_council_config():
     """Load council configuration from file, or return defaults."""
+    try:
+        mtime_ns = os.stat(CONFIG_FILE).st_mtime_ns
+    except FileNotFoundError:
+        mtime_ns = 0
+    if mtime_ns == _config_cache["mtime_ns"]:
+        return _config_cache["models"], _config_cache["chairman"]
+
     _ensure_config_dir()
-    if os.path.exists(CONFIG_FILE):
+    models, chairman = DEFAULT_COUNCIL_MODELS, DEFAULT_CHAIRMAN_MODEL
+    if mtime_ns:
         try:
-            with open(CONFIG_FILE, 'r') as f:
-                config = json.load(f)
-                return config.get('council_models', DEFAULT_COUNCIL_MODELS), config.get('chairman_model', DEFAULT_CHAIRMAN_MODEL)
-        except (json.JSONDecodeError, IOError):
+            with open(CONFIG_FILE, 'rb') as f:
+                config = orjson.loads(f.read())
+                models = tuple(config.get('council_models', DEFAULT_COUNCIL_MODELS))
+                chairman = config.get('chairman_model', DEFAULT_CHAIRMAN_MODEL)
+        except (orjson.JSONDecodeError, IOError):
             pass
-    return DEFAULT_COUNCIL_MODELS.copy(), DEFAULT_CHAIRMAN_MODEL
+
+    _config_cache.update(mtime_ns=mtime_ns, models=models, chairman=chairman)
+    return models, chairman
 
 
-def save_council_config(council_models: list, chairman_model: str):
+def save_council_config(council_models: Sequence[str], chairman_model: str):
     """Save council configuration to file."""
     _ensure_config_dir()
     config = {
-        'council_models': council_models,
+        'council_models': list(council_models),
         'chairman_model': chairman_model
     }
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=2)
+    with open(CONFIG_FILE, 'wb') as f:
+        f.write(orjson.dumps(config, option=orjson.OPT_INDENT_2))
+    # Force the next load to re-read, even if the mtime didn't visibly change
+    _config_cache["mtime_ns"] = -1
 
 
 def get_council_models():
@@ -74,7 +108,7 @@ def get_chairman_model():
 COUNCIL_MODELS, CHAIRMAN_MODEL = load_council_config()
 
 # Supported direct providers (others fall back to OpenRouter)
-DIRECT_PROVIDERS = ["openai", "anthropic"]
+DIRECT_PROVIDERS = frozenset({"openai", "anthropic"})
 
 # CLI-based model access configuration
 # Format: "cli:<cli_name>" in model identifier routes to CLI execution
@@ -87,6 +121,8 @@ DIRECT_PROVIDERS = ["openai", "anthropic"]
 #   - command: The CLI command to execute
 #   - args: Additional arguments (prompt is passed via stdin)
 #   - timeout: Max execution time in seconds
+#   - env: Extra environment variables passed through to the CLI (on top of the
+#     base set in cli_provider and CLI_ENV_PASSTHROUGH); a trailing "*" matches a prefix
 CLI_COMMANDS = {
     "gemini": {
         "command": "gemini",
@@ -95,16 +131,32 @@ CLI_COMMANDS = {
         "output_format_arg": ["--output-format", "text"],  # Ensure text output
         "prompt_flag": "-p",  # Flag to pass prompt as argument value
         "timeout": 120,
+        "env": ["GEMINI_API_KEY", "GOOGLE_API_KEY", "GOOGLE_CLOUD_PROJECT", "GOOGLE_APPLICATION_CREDENTIALS"],
     },
     "claude": {
         "command": "claude",
         "args": ["-p", "--allowedTools", "WebSearch,WebFetch"],  # Enable web search tools
         "timeout": 120,
+        "env": ["ANTHROPIC_API_KEY"],
     },
     "codex": {
         "command": "codex",
         "args": ["exec", "--skip-git-repo-check", "--enable", "web_search_request"],  # Enable web search
         "timeout": 120,
         "use_output_file": True,  # Codex writes clean output to -o file
+        "output_fd": True,  # -o can target a /dev/fd pipe, so skip the temp file (non-Windows)
+        "env": ["OPENAI_API_KEY", "CODEX_HOME"],
     },
 }
+
+# Extra environment variables passed through to every CLI (comma-separated names;
+# a trailing "*" matches a prefix, e.g. "AZURE_*")
+CLI_ENV_PASSTHROUGH = [
+    key.strip() for key in os.getenv("CLI_ENV_PASSTHROUGH", "").split(",") if key.strip()
+]
+
+# Largest prompt (UTF-8 bytes) passed to a CLI; bigger ones are rejected before spawning
+MAX_CLI_PROMPT_BYTES = 2 * 1024 * 1024
+# Largest prompt for CLIs that take it as a command-line argument (prompt_flag,
+# use_positional_arg, use_output_file); Linux caps one argument at 128 KiB
+MAX_CLI_ARG_BYTES = 128 * 1024
@@ -1,16 +1,21 @@
 """3-stage LLM Council orchestration."""
 
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from .providers import query_models_parallel, query_model
 from .config import get_council_models, get_chairman_model
 
 
-async def stage1_collect_responses(user_query: str) -> List[Dict[str, Any]]:
+async def stage1_collect_responses(
+    user_query: str,
+    on_progress: Optional[Callable[[str, str], None]] = None
+) -> List[Dict[str, Any]]:
     """
     Stage 1: Collect individual responses from all council models.
 
     Args:
         user_query: The user's question
+        on_progress: Optional callback invoked with (model, chunk) as partial
+            output arrives from models that stream
 
     Returns:
         List of dicts with 'model' and 'response' keys
@@ -18,7 +23,7 @@ async def stage1_collect_responses(user_query: str) -> List[Dict[str, Any]]:
     messages = [{"role": "user", "content": user_query}]
 
     # Query all models in parallel
-    responses = await query_models_parallel(get_council_models(), messages)
+    responses = await query_models_parallel(get_council_models(), messages, on_progress)
 
     # Format results - include both successful and failed responses
     stage1_results = []
@@ -40,9 +45,27 @@ async def stage1_collect_responses(user_query: str) -> List[Dict[str, Any]]:
     return stage1_results
 
 
+def build_label_to_model(stage1_results: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Assign anonymized labels (Response A, Response B, etc.) to Stage 1 results.
+
+    Args:
+        stage1_results: Results from Stage 1
+
+    Returns:
+        Mapping from label to model name, covering successful responses only
+    """
+    successful_results = [r for r in stage1_results if not r.get('error', False)]
+    return {
+        f"Response {chr(65 + i)}": result['model']  # A, B, C, ...
+        for i, result in enumerate(successful_results)
+    }
+
+
 async def stage2_collect_rankings(
     user_query: str,
-    stage1_results: List[Dict[str, Any]]
+    stage1_results: List[Dict[str, Any]],
+    label_to_model: Optional[Dict[str, str]] = None
 ) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
     """
     Stage 2: Each model ranks the anonymized responses.
@@ -50,6 +73,7 @@ async def stage2_collect_rankings(
     Args:
         user_query: The original user query
         stage1_results: Results from Stage 1
+        label_to_model: Mapping from build_label_to_model(), if already built
 
     Returns:
         Tuple of (rankings list, label_to_model mapping)
@@ -61,19 +85,13 @@ async def stage2_collect_rankings(
     if not successful_results:
         return [], {}
 
-    # Create anonymized labels for responses (Response A, Response B, etc.)
-    labels = [chr(65 + i) for i in range(len(successful_results))]  # A, B, C, ...
-
-    # Create mapping from label to model name
-    label_to_model = {
-        f"Response {label}": result['model']
-        for label, result in zip(labels, successful_results)
-    }
+    if label_to_model is None:
+        label_to_model = build_label_to_model(stage1_results)
 
     # Build the ranking prompt
     responses_text = "\n\n".join([
-        f"Response {label}:\n{result['response']}"
-        for label, result in zip(labels, successful_results)
+        f"{label}:\n{result['response']}"
+        for label, result in zip(label_to_model, successful_results)
     ])
 
     ranking_prompt = f"""You are evaluating different responses to the following question:
@@ -254,10 +272,10 @@ def calculate_aggregate_rankings(
     model_positions = defaultdict(list)
 
     for ranking in stage2_results:
-        ranking_text = ranking['ranking']
-
-        # Parse the ranking from the structured format
-        parsed_ranking = parse_ranking_from_text(ranking_text)
+        # Reuse the ranking parsed in Stage 2; only parse if it's missing
+        parsed_ranking = ranking.get('parsed_ranking')
+        if parsed_ranking is None:
+            parsed_ranking = parse_ranking_from_text(ranking['ranking'])
 
         for position, label in enumerate(parsed_ranking, start=1):
             if label in label_to_model:
@@ -4,20 +4,42 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager
 import uuid
-import json
 import asyncio
-import shutil
+import weakref
+import functools
+import logging
+import orjson
 
 from . import storage
-from .council import run_full_council, generate_conversation_title, stage1_collect_responses, stage2_collect_rankings, stage3_synthesize_final, calculate_aggregate_rankings
+from .utils import cached_which, peek_which, start_log_listener, stop_log_listener
+from .providers import aclose_clients
+from .council import run_full_council, generate_conversation_title, stage1_collect_responses, build_label_to_model, stage2_collect_rankings, stage3_synthesize_final, calculate_aggregate_rankings
 from .config import (
     OPENROUTER_API_KEY, OPENAI_API_KEY, ANTHROPIC_API_KEY,
-    CLI_COMMANDS, get_council_models, get_chairman_model, save_council_config
+    CLI_COMMANDS, DIRECT_PROVIDERS, load_council_config, save_council_config
 )
 
-app = FastAPI(title="LLM Council API")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the background log writer; release pooled provider connections on shutdown."""
+    log_listener = start_log_listener()
+    try:
+        yield
+        await aclose_clients()
+    finally:
+        stop_log_listener(log_listener)
+
+
+app = FastAPI(
+    title="LLM Council API",
+    lifespan=lifespan,
+)
 
 # Enable CORS for local development
 app.add_middleware(
@@ -29,6 +51,65 @@ app.add_middleware(
 )
 
 
+def _sse_event(payload: Dict[str, Any]) -> bytes:
+    """Encode a payload as a Server-Sent Events data frame."""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+# Payload-free SSE events, encoded once at import
+_STAGE1_START = _sse_event({"type": "stage1_start"})
+_STAGE3_START = _sse_event({"type": "stage3_start"})
+_COMPLETE = _sse_event({"type": "complete"})
+
+
+# One lock per conversation, held around every storage call that touches it.
+# Storage functions read-modify-write JSON files in worker threads, so two
+# requests on the same conversation would otherwise lose each other's update.
+# Entries disappear once no request holds or waits on the lock.
+_conversation_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+async def _run_storage(conversation_id: str, func, *args):
+    """Run a storage function for a conversation in a thread, under its lock."""
+    lock = _conversation_locks.get(conversation_id)
+    if lock is None:
+        lock = _conversation_locks[conversation_id] = asyncio.Lock()
+    async with lock:
+        return await asyncio.to_thread(func, conversation_id, *args)
+
+
+# Assistant-message writes deferred past the end of a stream, keyed by
+# conversation id. Anything that touches a conversation waits for its pending
+# write first, so a follow-up request can't read (and overwrite) stale data.
+_pending_saves: Dict[str, asyncio.Task] = {}
+
+
+def _on_save_done(conversation_id: str, task: asyncio.Task):
+    """Forget a finished deferred write and report it if it failed."""
+    if _pending_saves.get(conversation_id) is task:
+        del _pending_saves[conversation_id]
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(
+            "Error saving conversation %s: %s", conversation_id, task.exception(),
+            extra={"conversation_id": conversation_id}
+        )
+
+
+def _defer_save(conversation_id: str, func, *args):
+    """Run a storage write in a thread without waiting for it."""
+    task = asyncio.create_task(_run_storage(conversation_id, func, *args))
+    _pending_saves[conversation_id] = task
+    task.add_done_callback(functools.partial(_on_save_done, conversation_id))
+
+
+async def _wait_for_saves(*conversation_ids: str):
+    """Wait for deferred writes to finish (all of them if no ids are given)."""
+    ids = conversation_ids or list(_pending_saves)
+    tasks = [_pending_saves[cid] for cid in ids if cid in _pending_saves]
+    if tasks:
+        await asyncio.wait(tasks)
+
+
 class CreateConversationRequest(BaseModel):
     """Request to create a new conversation."""
     pass
@@ -55,6 +136,84 @@ class Conversation(BaseModel):
     messages: List[Dict[str, Any]]
 
 
+class Stage1Result(BaseModel):
+    """A council member's individual response."""
+    model: str
+    response: str
+    error: bool = False
+
+
+class Stage2Result(BaseModel):
+    """A council member's ranking of the anonymized responses."""
+    model: str
+    ranking: str
+    parsed_ranking: List[str]
+    error: bool = False
+
+
+class Stage3Result(BaseModel):
+    """The chairman's final synthesis."""
+    model: str
+    response: str
+
+
+class AggregateRanking(BaseModel):
+    """A model's average position across all peer rankings."""
+    model: str
+    average_rank: float
+    rankings_count: int
+
+
+class CouncilMetadata(BaseModel):
+    """Label mapping and aggregate rankings (empty if every model failed)."""
+    label_to_model: Dict[str, str] = {}
+    aggregate_rankings: List[AggregateRanking] = []
+
+
+class SendMessageResponse(BaseModel):
+    """Complete result of the 3-stage council process."""
+    stage1: List[Stage1Result]
+    stage2: List[Stage2Result]
+    stage3: Stage3Result
+    metadata: CouncilMetadata
+
+
+class ApiKeyStatus(BaseModel):
+    """Whether a provider API key is configured."""
+    configured: bool
+    key_preview: Optional[str]
+
+
+class CliToolStatus(BaseModel):
+    """Whether a CLI tool is installed."""
+    command: str
+    available: bool
+    path: Optional[str]
+
+
+class ModelStatus(BaseModel):
+    """Provider type and readiness of a configured model."""
+    identifier: str
+    type: str
+    ready: bool
+
+
+class HealthResponse(BaseModel):
+    """Availability of API keys, CLI tools and configured models."""
+    status: str
+    api_keys: Dict[str, ApiKeyStatus]
+    cli_tools: Dict[str, CliToolStatus]
+    council_models: List[ModelStatus]
+    chairman_model: ModelStatus
+    all_ready: bool
+
+
+class CouncilConfig(BaseModel):
+    """Current council configuration."""
+    council_models: List[str]
+    chairman_model: str
+
+
 @app.get("/")
 async def root():
     """Health check endpoint."""
@@ -63,27 +222,27 @@ async def root():
 
 def _get_model_info(model: str, api_keys: dict, cli_tools: dict) -> dict:
     """Helper to get model info with type and ready status."""
-    model_info = {"identifier": model}
-    if model.startswith("cli:"):
-        cli_name = model[4:]
-        model_info["type"] = "cli"
-        model_info["ready"] = cli_tools.get(cli_name, {}).get("available", False)
-    elif model.startswith("openrouter:"):
-        model_info["type"] = "openrouter"
-        model_info["ready"] = api_keys["openrouter"]["configured"]
-    elif model.startswith("openai/"):
-        model_info["type"] = "openai"
-        model_info["ready"] = api_keys["openai"]["configured"]
-    elif model.startswith("anthropic/"):
-        model_info["type"] = "anthropic"
-        model_info["ready"] = api_keys["anthropic"]["configured"]
-    else:
-        model_info["type"] = "openrouter"
-        model_info["ready"] = api_keys["openrouter"]["configured"]
-    return model_info
-
-
-@app.get("/api/health")
+    prefix, colon, rest = model.partition(":")
+    if colon and prefix == "cli":
+        return {
+            "identifier": model,
+            "type": "cli",
+            "ready": cli_tools.get(rest, {}).get("available", False)
+        }
+
+    # "openrouter:..." never matches here, since its first segment keeps the prefix
+    provider, slash, _ = model.partition("/")
+    # Providers without a direct API client go through OpenRouter
+    if not slash or provider not in DIRECT_PROVIDERS:
+        provider = "openrouter"
+    return {
+        "identifier": model,
+        "type": provider,
+        "ready": api_keys[provider]["configured"]
+    }
+
+
+@app.get("/api/health", response_model=HealthResponse)
 async def health_check():
     """
     Doctor endpoint - checks availability of API keys and CLI tools.
@@ -105,19 +264,28 @@ async def health_check():
         }
     }
 
-    # Check CLI tools
-    cli_tools = {}
-    for cli_name, config in CLI_COMMANDS.items():
-        command = config["command"]
-        cli_tools[cli_name] = {
+    # Check CLI tools. Cached paths resolve inline; the rest walk PATH, so
+    # look them up concurrently off the event loop.
+    commands = [config["command"] for config in CLI_COMMANDS.values()]
+    paths = [peek_which(command) for command in commands]
+    missing = [i for i, path in enumerate(paths) if path is None]
+    if missing:
+        found = await asyncio.gather(
+            *(asyncio.to_thread(cached_which, commands[i]) for i in missing)
+        )
+        for i, path in zip(missing, found):
+            paths[i] = path
+    cli_tools = {
+        cli_name: {
             "command": command,
-            "available": shutil.which(command) is not None,
-            "path": shutil.which(command)
+            "available": path is not None,
+            "path": path
         }
+        for cli_name, command, path in zip(CLI_COMMANDS, commands, paths)
+    }
 
     # Get current council config (dynamic)
-    council_models = get_council_models()
-    chairman_model = get_chairman_model()
+    council_models, chairman_model = load_council_config()
 
     # Check model configuration
     models = [_get_model_info(m, api_keys, cli_tools) for m in council_models]
@@ -142,12 +310,13 @@ class UpdateConfigRequest(BaseModel):
     chairman_model: str
 
 
-@app.get("/api/config")
+@app.get("/api/config", response_model=CouncilConfig)
 async def get_config():
     """Get current council configuration."""
+    council_models, chairman_model = load_council_config()
     return {
-        "council_models": get_council_models(),
-        "chairman_model": get_chairman_model()
+        "council_models": council_models,
+        "chairman_model": chairman_model
     }
 
 
@@ -165,21 +334,23 @@ async def update_config(request: UpdateConfigRequest):
 @app.get("/api/conversations", response_model=List[ConversationMetadata])
 async def list_conversations():
     """List all conversations (metadata only)."""
-    return storage.list_conversations()
+    await _wait_for_saves()
+    return await asyncio.to_thread(storage.list_conversations)
 
 
 @app.post("/api/conversations", response_model=Conversation)
 async def create_conversation(request: CreateConversationRequest):
     """Create a new conversation."""
     conversation_id = str(uuid.uuid4())
-    conversation = storage.create_conversation(conversation_id)
+    conversation = await _run_storage(conversation_id, storage.create_conversation)
     return conversation
 
 
 @app.get("/api/conversations/{conversation_id}", response_model=Conversation)
 async def get_conversation(conversation_id: str):
     """Get a specific conversation with all its messages."""
-    conversation = storage.get_conversation(conversation_id)
+    await _wait_for_saves(conversation_id)
+    conversation = await _run_storage(conversation_id, storage.get_conversation)
     if conversation is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
     return conversation
@@ -188,20 +359,22 @@ async def get_conversation(conversation_id: str):
 @app.delete("/api/conversations/{conversation_id}")
 async def delete_conversation(conversation_id: str):
     """Delete a conversation."""
-    deleted = storage.delete_conversation(conversation_id)
+    await _wait_for_saves(conversation_id)
+    deleted = await _run_storage(conversation_id, storage.delete_conversation)
     if not deleted:
         raise HTTPException(status_code=404, detail="Conversation not found")
     return {"status": "ok", "deleted": conversation_id}
 
 
-@app.post("/api/conversations/{conversation_id}/message")
+@app.post("/api/conversations/{conversation_id}/message", response_model=SendMessageResponse)
 async def send_message(conversation_id: str, request: SendMessageRequest):
     """
     Send a message and run the 3-stage council process.
     Returns the complete response with all stages.
     """
     # Check if conversation exists
-    conversation = storage.get_conversation(conversation_id)
+    await _wait_for_saves(conversation_id)
+    conversation = await _run_storage(conversation_id, storage.get_conversation)
     if conversation is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
@@ -209,21 +382,22 @@ async def send_message(conversation_id: str, request: SendMessageRequest):
     is_first_message = len(conversation["messages"]) == 0
 
     # Add user message
-    storage.add_user_message(conversation_id, request.content)
+    await _run_storage(conversation_id, storage.add_user_message, request.content)
 
-    # If this is the first message, generate a title
+    # Start the 3-stage council process
+    council_task = asyncio.create_task(run_full_council(request.content))
+
+    # If this is the first message, generate a title while the council runs
     if is_first_message:
         title = await generate_conversation_title(request.content)
-        storage.update_conversation_title(conversation_id, title)
+        await _run_storage(conversation_id, storage.update_conversation_title, title)
 
-    # Run the 3-stage council process
-    stage1_results, stage2_results, stage3_result, metadata = await run_full_council(
-        request.content
-    )
+    stage1_results, stage2_results, stage3_result, metadata = await council_task
 
     # Add assistant message with all stages
-    storage.add_assistant_message(
+    await _run_storage(
         conversation_id,
+        storage.add_assistant_message,
         stage1_results,
         stage2_results,
         stage3_result
@@ -245,7 +419,8 @@ async def send_message_stream(conversation_id: str, request: SendMessageRequest)
     Returns Server-Sent Events as each stage completes.
     """
     # Check if conversation exists
-    conversation = storage.get_conversation(conversation_id)
+    await _wait_for_saves(conversation_id)
+    conversation = await _run_storage(conversation_id, storage.get_conversation)
     if conversation is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
@@ -255,7 +430,7 @@ async def send_message_stream(conversation_id: str, request: SendMessageRequest)
     async def event_generator():
         try:
             # Add user message
-            storage.add_user_message(conversation_id, request.content)
+            await _run_storage(conversation_id, storage.add_user_message, request.content)
 
             # Start title generation in parallel (don't await yet)
             title_task = None
@@ -263,41 +438,64 @@ async def send_message_stream(conversation_id: str, request: SendMessageRequest)
                 title_task = asyncio.create_task(generate_conversation_title(request.content))
 
             # Stage 1: Collect responses
-            yield f"data: {json.dumps({'type': 'stage1_start'})}\n\n"
-            stage1_results = await stage1_collect_responses(request.content)
-            yield f"data: {json.dumps({'type': 'stage1_complete', 'data': stage1_results})}\n\n"
-
-            # Stage 2: Collect rankings
-            yield f"data: {json.dumps({'type': 'stage2_start'})}\n\n"
-            stage2_results, label_to_model = await stage2_collect_rankings(request.content, stage1_results)
+            yield _STAGE1_START
+            # Forward partial output from streaming (CLI) models as it arrives
+            progress = asyncio.Queue()
+            stage1_task = asyncio.create_task(stage1_collect_responses(
+                request.content,
+                on_progress=lambda model, chunk: progress.put_nowait((model, chunk))
+            ))
+            stage1_task.add_done_callback(lambda _: progress.put_nowait(None))
+            try:
+                while (update := await progress.get()) is not None:
+                    model, chunk = update
+                    yield _sse_event({'type': 'stage1_progress', 'model': model, 'data': chunk})
+                stage1_results = await stage1_task
+            finally:
+                # Client disconnected mid-stage: stop the queries (and any CLI processes)
+                if not stage1_task.done():
+                    stage1_task.cancel()
+                    try:
+                        await stage1_task
+                    except asyncio.CancelledError:
+                        pass
+            yield _sse_event({'type': 'stage1_complete', 'data': stage1_results})
+
+            # Stage 2: Collect rankings. The label mapping only depends on
+            # Stage 1, so send it up front for the frontend to use right away.
+            label_to_model = build_label_to_model(stage1_results)
+            yield _sse_event({'type': 'stage2_start', 'metadata': {'label_to_model': label_to_model}})
+            stage2_results, label_to_model = await stage2_collect_rankings(request.content, stage1_results, label_to_model)
             aggregate_rankings = calculate_aggregate_rankings(stage2_results, label_to_model)
-            yield f"data: {json.dumps({'type': 'stage2_complete', 'data': stage2_results, 'metadata': {'label_to_model': label_to_model, 'aggregate_rankings': aggregate_rankings}})}\n\n"
+            yield _sse_event({'type': 'stage2_complete', 'data': stage2_results, 'metadata': {'label_to_model': label_to_model, 'aggregate_rankings': aggregate_rankings}})
 
             # Stage 3: Synthesize final answer
-            yield f"data: {json.dumps({'type': 'stage3_start'})}\n\n"
+            yield _STAGE3_START
             stage3_result = await stage3_synthesize_final(request.content, stage1_results, stage2_results)
-            yield f"data: {json.dumps({'type': 'stage3_complete', 'data': stage3_result})}\n\n"
+            yield _sse_event({'type': 'stage3_complete', 'data': stage3_result})
 
             # Wait for title generation if it was started
             if title_task:
                 title = await title_task
-                storage.update_conversation_title(conversation_id, title)
-                yield f"data: {json.dumps({'type': 'title_complete', 'data': {'title': title}})}\n\n"
+                await _run_storage(conversation_id, storage.update_conversation_title, title)
+                yield _sse_event({'type': 'title_complete', 'data': {'title': title}})
 
-            # Save complete assistant message
-            storage.add_assistant_message(
+            # Save complete assistant message in the background; the client
+            # doesn't need to wait for the disk write to see completion
+            _defer_save(
                 conversation_id,
+                storage.add_assistant_message,
                 stage1_results,
                 stage2_results,
                 stage3_result
             )
 
             # Send completion event
-            yield f"data: {json.dumps({'type': 'complete'})}\n\n"
+            yield _COMPLETE
 
         except Exception as e:
             # Send error event
-            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+            yield _sse_event({'type': 'error', 'message': str(e)})
 
     return StreamingResponse(
         event_generator(),
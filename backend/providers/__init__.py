@@ -8,7 +8,7 @@ This module provides a unified interface to query models from different provider
 - CLI (local CLI tools like gemini, claude, openai)
 
 Usage:
-    from backend.providers import query_model, query_models_parallel
+    from backend.providers import query_model, query_models_parallel, query_models_parallel_stream
 
     # Query via API
     response = await query_model("openai/gpt-4o", messages)
@@ -18,8 +18,12 @@ Usage:
 
     # Query multiple models in parallel
     responses = await query_models_parallel(["openai/gpt-4o", "cli:gemini"], messages)
+
+    # Or handle each response as soon as its model finishes
+    async for model, response in query_models_parallel_stream(models, messages):
+        ...
 """
 
-from .router import query_model, query_models_parallel
+from .router import query_model, query_models_parallel, query_models_parallel_stream, aclose_clients
 
-__all__ = ["query_model", "query_models_parallel"]
+__all__ = ["query_model", "query_models_parallel", "query_models_parallel_stream", "aclose_clients"]
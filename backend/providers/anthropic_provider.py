@@ -1,9 +1,21 @@
 """Anthropic/Claude API client for direct model queries."""
 
-import httpx
+import logging
+
+import orjson
 from typing import List, Dict, Any, Optional
+from .http_utils import SharedClient, read_error_body, request_timeout, send_with_retry
 from ..config import ANTHROPIC_API_KEY, ANTHROPIC_API_URL
 
+logger = logging.getLogger(__name__)
+
+_client = SharedClient({
+    "x-api-key": ANTHROPIC_API_KEY,
+    "Content-Type": "application/json",
+    "anthropic-version": "2023-06-01",
+})
+aclose_client = _client.aclose
+
 
 async def query_anthropic(
     model: str,
@@ -22,15 +34,9 @@ async def query_anthropic(
         Response dict with 'content' and optional 'reasoning_details', or None if failed
     """
     if not ANTHROPIC_API_KEY:
-        print(f"Error: ANTHROPIC_API_KEY not configured")
+        logger.error("ANTHROPIC_API_KEY not configured")
         return None
 
-    headers = {
-        "x-api-key": ANTHROPIC_API_KEY,
-        "Content-Type": "application/json",
-        "anthropic-version": "2023-06-01",
-    }
-
     # Convert OpenAI-style messages to Anthropic format
     # Extract system message if present
     system_content = None
@@ -55,37 +61,42 @@ async def query_anthropic(
         payload["system"] = system_content
 
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(
-                ANTHROPIC_API_URL,
-                headers=headers,
-                json=payload
-            )
-            response.raise_for_status()
-
-            data = response.json()
-
-            # Extract text content from Anthropic response format
-            # Response content is an array of content blocks
-            content_blocks = data.get('content', [])
-            text_content = ""
-            reasoning_details = None
-
-            for block in content_blocks:
-                if block.get('type') == 'text':
-                    text_content += block.get('text', '')
-                elif block.get('type') == 'thinking':
-                    # Extended thinking (for Claude with thinking enabled)
-                    reasoning_details = block.get('thinking', '')
-
-            return {
-                'content': text_content,
-                'reasoning_details': reasoning_details
-            }
-
-    except httpx.HTTPStatusError as e:
-        print(f"Anthropic API error for {model}: {e.response.status_code} - {e.response.text}")
-        return None
+        client = _client.get()
+        request = client.build_request(
+            "POST", ANTHROPIC_API_URL, content=orjson.dumps(payload), timeout=request_timeout(timeout)
+        )
+        response = await send_with_retry(client, request)
+        try:
+            if not response.is_success:
+                error_text = await read_error_body(response)
+                logger.error(
+                    "Anthropic API error for %s: %s - %s", model, response.status_code, error_text,
+                    extra={"model": model, "status": response.status_code}
+                )
+                return None
+            data = orjson.loads(await response.aread())
+        finally:
+            await response.aclose()
+
+        # Extract text content from Anthropic response format
+        # Response content is an array of content blocks
+        content_blocks = data.get('content', [])
+        text_parts = []
+        reasoning_details = None
+
+        for block in content_blocks:
+            block_type = block.get('type')
+            if block_type == 'text':
+                text_parts.append(block.get('text', ''))
+            elif block_type == 'thinking':
+                # Extended thinking (for Claude with thinking enabled)
+                reasoning_details = block.get('thinking', '')
+
+        return {
+            'content': "".join(text_parts),
+            'reasoning_details': reasoning_details
+        }
+
     except Exception as e:
-        print(f"Error querying Anthropic model {model}: {e}")
+        logger.error("Error querying Anthropic model %s: %s", model, e, extra={"model": model})
         return None
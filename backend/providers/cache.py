@@ -0,0 +1,97 @@
+"""
+Exact-match response cache for model queries.
+
+Identical (model, messages) requests are answered from memory instead of
+going back to the provider. Only successful responses are cached.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import orjson
+
+from ..config import (
+    LLM_CACHE_ENABLED, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL,
+    CLI_CACHE_MAX_ENTRIES, CLI_CACHE_TTL
+)
+
+
+def cache_key(model: str, messages: List[Dict[str, str]]) -> str:
+    """
+    Build a stable cache key for a model query.
+
+    Args:
+        model: Model identifier
+        messages: List of message dicts with 'role' and 'content'
+
+    Returns:
+        SHA-256 hex digest of the canonicalized request
+    """
+    body = orjson.dumps({"model": model, "messages": messages}, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(body).hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU store with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class LLMCache:
+    """Response cache in front of the provider router."""
+
+    def __init__(self, backend: MemoryBackend, ttl: float = 3600, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+
+    async def get(self, model: str, messages: List[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+        """Return a cached response, or None on a miss (or when disabled)."""
+        if not self.enabled:
+            return None
+        return await self.backend.get(cache_key(model, messages))
+
+    async def set(self, model: str, messages: List[Dict[str, str]], response: Optional[Dict[str, Any]]):
+        """Store a response if caching is enabled and the query succeeded."""
+        if not self.enabled or response is None or response.get('error'):
+            return
+        await self.backend.set(cache_key(model, messages), response, self.ttl)
+
+
+# Shared cache used by query_model; disabled unless LLM_CACHE_ENABLED is set
+response_cache = LLMCache(
+    MemoryBackend(max_entries=LLM_CACHE_MAX_ENTRIES),
+    ttl=LLM_CACHE_TTL,
+    enabled=LLM_CACHE_ENABLED,
+)
+
+# Separate, longer-lived cache used by query_cli; same on/off switch
+cli_response_cache = LLMCache(
+    MemoryBackend(max_entries=CLI_CACHE_MAX_ENTRIES),
+    ttl=CLI_CACHE_TTL,
+    enabled=LLM_CACHE_ENABLED,
+)
@@ -1,135 +1,459 @@
 """CLI-based model provider for local CLI tool access."""
 
 import asyncio
-import shutil
+import codecs
+import logging
+import re
+import signal
+import sys
 import tempfile
 import os
-from typing import List, Dict, Any, Optional
-from ..config import CLI_COMMANDS
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, AsyncIterator, Callable, Tuple
+from ..config import CLI_COMMANDS, CLI_ENV_PASSTHROUGH, MAX_CLI_PROMPT_BYTES, MAX_CLI_ARG_BYTES
+from ..utils import cached_which, forget_which
+from .cache import cli_response_cache
 
+logger = logging.getLogger(__name__)
 
-async def query_cli(
+@dataclass(frozen=True, slots=True)
+class CLIConfig:
+    """A CLI_COMMANDS entry with defaults filled in and the base argv prebuilt."""
+    command: str
+    base_cmd: Tuple[str, ...]
+    timeout: Optional[float]
+    use_output_file: bool
+    output_fd: bool
+    use_positional_arg: bool
+    prompt_flag: Optional[str]
+    env: Dict[str, str]
+
+
+# Environment every CLI gets. More can be added per CLI ("env" in CLI_COMMANDS)
+# or for all CLIs via CLI_ENV_PASSTHROUGH. A trailing "*" matches a prefix.
+_CLI_BASE_ENV_KEYS = (
+    "PATH", "HOME", "USER", "LANG", "LC_ALL", "TERM", "TMPDIR", "XDG_CONFIG_HOME",
+    # Corporate proxies and custom CA bundles
+    "HTTP_PROXY", "HTTPS_PROXY", "NO_PROXY", "http_proxy", "https_proxy", "no_proxy",
+    "SSL_CERT_FILE", "NODE_EXTRA_CA_CERTS",
+    # Alternate backends and endpoints: Gemini on Vertex AI, Claude on
+    # Bedrock/Vertex, OpenAI-compatible gateways
+    "GOOGLE_GENAI_USE_VERTEXAI", "GOOGLE_CLOUD_LOCATION",
+    "CLAUDE_CODE_USE_BEDROCK", "CLAUDE_CODE_USE_VERTEX", "CLAUDE_CONFIG_DIR",
+    "ANTHROPIC_BASE_URL", "OPENAI_BASE_URL", "AWS_*",
+)
+if sys.platform == "win32":
+    # Node-based CLIs can't start on Windows without these
+    _CLI_BASE_ENV_KEYS += ("SYSTEMROOT", "USERPROFILE", "APPDATA", "LOCALAPPDATA", "PATHEXT", "COMSPEC")
+
+
+def _build_cli_env(extra_keys: List[str]) -> Dict[str, str]:
+    """Snapshot the subset of os.environ a CLI needs, instead of copying all of it per spawn."""
+    keys = (*_CLI_BASE_ENV_KEYS, *CLI_ENV_PASSTHROUGH, *extra_keys)
+    names = {key for key in keys if not key.endswith("*")}
+    prefixes = tuple(key[:-1] for key in keys if key.endswith("*"))
+    return {
+        key: value
+        for key, value in os.environ.items()
+        if key in names or (prefixes and key.startswith(prefixes))
+    }
+
+
+def _build_cli_configs(commands: Dict[str, Dict[str, Any]]) -> Dict[str, CLIConfig]:
+    """Resolve raw CLI_COMMANDS entries into CLIConfig objects."""
+    return {
+        name: CLIConfig(
+            command=raw["command"],
+            base_cmd=(
+                raw["command"],
+                *raw.get("args", []),
+                *raw.get("model_arg", []),
+                *raw.get("output_format_arg", []),
+            ),
+            timeout=raw.get("timeout"),
+            use_output_file=raw.get("use_output_file", False),
+            output_fd=raw.get("output_fd", False),
+            use_positional_arg=raw.get("use_positional_arg", False),
+            prompt_flag=raw.get("prompt_flag"),
+            env=_build_cli_env(raw.get("env", [])),
+        )
+        for name, raw in commands.items()
+    }
+
+
+# CLI_COMMANDS stays the documented source of truth; queries use this view
+_CLI_CONFIGS = _build_cli_configs(CLI_COMMANDS)
+
+# Chunk size for draining CLI stdout/stderr
+_READ_CHUNK_SIZE = 64 * 1024
+
+# Most stderr kept per CLI run; anything past this is drained and dropped
+_STDERR_MAX_BYTES = 16 * 1024
+
+# Prompts smaller than this are written into an OS pipe up front and handed to
+# the CLI as its stdin fd. 16 KiB is the smallest default pipe buffer among
+# supported platforms (macOS), so the write can never block the event loop.
+_STDIN_PIPE_MAX_BYTES = 16 * 1024
+
+# First stderr line mentioning an error, matched on raw bytes
+_ERROR_LINE_RE = re.compile(rb'^.*error.*$', re.IGNORECASE | re.MULTILINE)
+
+# Output-file CLIs that opt in can write to a /dev/fd pipe instead of a temp file
+_FD_OUTPUT_SUPPORTED = sys.platform != "win32"
+
+# CLIs run in their own session so a timeout or cancel can signal the whole
+# process group, including helpers they spawn that would hold our pipes open
+_PROCESS_GROUPS_SUPPORTED = sys.platform != "win32"
+
+# How long a CLI gets to exit after SIGTERM before it is killed
+_TERMINATE_GRACE_SECONDS = 2.0
+
+# Prefix for each message role when flattening a conversation into one prompt
+_ROLE_PREFIX = {"system": "System: ", "user": "", "assistant": "Assistant: "}
+
+
+def _prefilled_pipe(data: bytes) -> int:
+    """Return the read end of a pipe that already holds data and is at EOF."""
+    read_fd, write_fd = os.pipe()
+    try:
+        os.write(write_fd, data)
+    except OSError:
+        os.close(read_fd)
+        raise
+    finally:
+        os.close(write_fd)
+    return read_fd
+
+
+def _read_file_bytes(path: str) -> bytes:
+    """Read a whole file with a single read() sized from fstat."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, os.fstat(fd).st_size)
+    finally:
+        os.close(fd)
+
+
+async def _read_stream(
+    stream: asyncio.StreamReader,
+    buffer: bytearray,
+    limit: Optional[int] = None
+):
+    """Drain an async stream until EOF, keeping at most limit bytes in buffer."""
+    while True:
+        chunk = await stream.read(_READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        if limit is None:
+            buffer.extend(chunk)
+        elif len(buffer) < limit:
+            buffer.extend(chunk[:limit - len(buffer)])
+
+
+async def _write_stdin(process: asyncio.subprocess.Process, data: bytes):
+    """Write data to the process's stdin and close it."""
+    try:
+        process.stdin.write(data)
+        await process.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        # CLI exited without reading all input; its exit code tells the story
+        pass
+    finally:
+        process.stdin.close()
+
+
+def _signal_cli(process: asyncio.subprocess.Process, force: bool):
+    """Terminate (or kill, if force) the CLI and, where supported, its process group."""
+    try:
+        if _PROCESS_GROUPS_SUPPORTED:
+            os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+        elif force:
+            process.kill()
+        else:
+            process.terminate()
+    except ProcessLookupError:
+        pass
+
+
+async def _stop_cli(process: asyncio.subprocess.Process):
+    """Ask the CLI to exit, escalating to a kill if it doesn't within the grace period."""
+    _signal_cli(process, force=False)
+    try:
+        await asyncio.wait_for(process.wait(), timeout=_TERMINATE_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        _signal_cli(process, force=True)
+        await process.wait()
+    except asyncio.CancelledError:
+        # Cancelled again while waiting; don't leave the CLI behind
+        _signal_cli(process, force=True)
+        raise
+
+
+class CLIError(Exception):
+    """A CLI query failed; the message is suitable to show to the user."""
+
+    def __init__(self, message: str, returncode: Optional[int] = None, stderr: str = ""):
+        super().__init__(message)
+        # Exit status and full stderr of a failed run, for logging
+        self.returncode = returncode
+        self.stderr = stderr
+
+
+async def query_cli_stream(
     cli_name: str,
     messages: List[Dict[str, str]],
     timeout: float = 120.0
-) -> Optional[Dict[str, Any]]:
+) -> AsyncIterator[str]:
     """
-    Query a model via local CLI tool.
+    Query a model via local CLI tool, yielding output as the CLI produces it.
+
+    CLIs that write their answer to an output file (like Codex) yield it in
+    one piece once the process exits.
 
     Args:
         cli_name: CLI identifier (e.g., "gemini", "claude", "codex")
         messages: List of message dicts with 'role' and 'content'
         timeout: Request timeout in seconds
 
-    Returns:
-        Response dict with 'content', or None if failed
+    Yields:
+        Decoded chunks of the CLI's output
+
+    Raises:
+        CLIError: If the CLI is unknown, missing, fails, or times out
     """
-    if cli_name not in CLI_COMMANDS:
-        error_msg = f"Unknown CLI '{cli_name}'. Available: {list(CLI_COMMANDS.keys())}"
-        print(f"Error: {error_msg}")
-        return {'error': True, 'content': f"Error: {error_msg}"}
+    config = _CLI_CONFIGS.get(cli_name)
+    if config is None:
+        raise CLIError(f"Unknown CLI '{cli_name}'. Available: {list(_CLI_CONFIGS)}")
 
-    config = CLI_COMMANDS[cli_name]
-    command = config["command"]
-    args = config.get("args", [])
-    cli_timeout = config.get("timeout", timeout)
-    use_output_file = config.get("use_output_file", False)
-    use_positional_arg = config.get("use_positional_arg", False)
-    model_arg = config.get("model_arg", [])
-    output_format_arg = config.get("output_format_arg", [])
-    prompt_flag = config.get("prompt_flag", None)
-
-    # Check if CLI exists
-    if not shutil.which(command):
-        error_msg = f"CLI command '{command}' not found in PATH"
-        print(f"Error: {error_msg}")
-        return {'error': True, 'content': f"Error: {error_msg}"}
+    cli_timeout = config.timeout if config.timeout is not None else timeout
+    use_output_file = config.use_output_file
+
+    # Check if CLI exists; exec the resolved path so there's no second PATH search
+    executable = cached_which(config.command)
+    if not executable:
+        raise CLIError(f"CLI command '{config.command}' not found in PATH")
 
     # Convert messages to a single prompt
-    prompt_parts = []
-    for msg in messages:
-        role = msg['role']
-        content = msg['content']
-        if role == 'system':
-            prompt_parts.append(f"System: {content}")
-        elif role == 'user':
-            prompt_parts.append(f"{content}")
-        elif role == 'assistant':
-            prompt_parts.append(f"Assistant: {content}")
-
-    prompt = "\n\n".join(prompt_parts)
-
-    output_file = None
+    prompt = "\n\n".join(
+        _ROLE_PREFIX[msg['role']] + msg['content']
+        for msg in messages
+        if msg['role'] in _ROLE_PREFIX
+    )
+
+    # Every character encodes to at least one byte, so a prompt with too many
+    # characters is rejected without encoding it at all
+    prompt_bytes = prompt.encode('utf-8') if len(prompt) <= MAX_CLI_PROMPT_BYTES else None
+    if prompt_bytes is None or len(prompt_bytes) > MAX_CLI_PROMPT_BYTES:
+        raise CLIError(f"Prompt for CLI '{cli_name}' exceeds {MAX_CLI_PROMPT_BYTES} bytes")
+    # A prompt passed in argv must fit in one argument, NUL terminator included,
+    # or the spawn fails with "Argument list too long"
+    prompt_in_argv = use_output_file or config.prompt_flag or config.use_positional_arg
+    if prompt_in_argv and len(prompt_bytes) + 1 > MAX_CLI_ARG_BYTES:
+        raise CLIError(
+            f"Prompt for CLI '{cli_name}' exceeds the {MAX_CLI_ARG_BYTES} byte command-line argument limit"
+        )
+
+    output_path = None
+    output_read_fd = output_write_fd = None
+    output_transport = None
+    process = None
+    helpers = []
     try:
         # Build command
-        cmd = [command] + args + model_arg + output_format_arg
+        cmd = [executable, *config.base_cmd[1:]]
 
         # Determine how to pass the prompt
         if use_output_file:
-            # For CLIs that use output file (like Codex), add the -o flag
-            output_file = tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False)
-            output_file.close()
-            cmd.extend(["-o", output_file.name])
+            # For CLIs that use output file (like Codex), add the -o flag.
+            # Point it at a pipe when supported so the answer never touches disk.
+            if config.output_fd and _FD_OUTPUT_SUPPORTED:
+                output_read_fd, output_write_fd = os.pipe()
+                cmd.extend(["-o", f"/dev/fd/{output_write_fd}"])
+            else:
+                fd, output_path = tempfile.mkstemp(suffix='.txt')
+                os.close(fd)
+                cmd.extend(["-o", output_path])
             # Codex takes prompt as argument, not stdin
             cmd.append(prompt)
             stdin_input = None
-        elif prompt_flag:
+        elif config.prompt_flag:
             # For CLIs that take prompt as a flag value (e.g., -p "prompt")
-            cmd.extend([prompt_flag, prompt])
+            cmd.extend([config.prompt_flag, prompt])
             stdin_input = None
-        elif use_positional_arg:
+        elif config.use_positional_arg:
             # For CLIs that take prompt as positional argument
             cmd.append(prompt)
             stdin_input = None
         else:
             # Default: pass prompt via stdin
-            stdin_input = prompt.encode('utf-8')
+            stdin_input = prompt_bytes
+        prompt = prompt_bytes = None
+
+        # Small prompts go through a pre-filled pipe, so the kernel hands them
+        # to the CLI without an asyncio write/drain loop
+        stdin_fd = None
+        stdin = asyncio.subprocess.PIPE if stdin_input else None
+        if stdin_input and len(stdin_input) < _STDIN_PIPE_MAX_BYTES:
+            stdin_fd = stdin = _prefilled_pipe(stdin_input)
+            stdin_input = None
 
         # Run CLI
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdin=asyncio.subprocess.PIPE if stdin_input else None,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=stdin,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                pass_fds=(output_write_fd,) if output_write_fd is not None else (),
+                env=config.env,
+                start_new_session=_PROCESS_GROUPS_SUPPORTED,
+            )
+        except FileNotFoundError:
+            # The cached path went stale (CLI moved or uninstalled); re-resolve next time
+            forget_which(config.command)
+            raise CLIError(f"CLI command '{config.command}' not found at {executable}") from None
+        finally:
+            if stdin_fd is not None:
+                os.close(stdin_fd)
+            if output_write_fd is not None:
+                os.close(output_write_fd)
+                output_write_fd = None
+
+        # The timeout covers the whole run, not each individual read
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + cli_timeout
+
+        stderr = bytearray()
+        helpers.append(asyncio.create_task(_read_stream(process.stderr, stderr, _STDERR_MAX_BYTES)))
+        output = bytearray()
+        if output_read_fd is not None:
+            # Drain the output pipe while the CLI runs so large answers can't fill it
+            output_reader = asyncio.StreamReader()
+            output_transport, _ = await loop.connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(output_reader),
+                os.fdopen(output_read_fd, 'rb', buffering=0)
+            )
+            output_read_fd = None
+            helpers.append(asyncio.create_task(_read_stream(output_reader, output)))
+        if stdin_input:
+            helpers.append(asyncio.create_task(_write_stdin(process, stdin_input)))
+
+        # Output-file CLIs print progress noise on stdout; drain it but don't yield it
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        while True:
+            chunk = await asyncio.wait_for(
+                process.stdout.read(_READ_CHUNK_SIZE),
+                timeout=deadline - loop.time()
+            )
+            if not chunk:
+                break
+            if not use_output_file:
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+        if not use_output_file:
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
 
-        stdout, stderr = await asyncio.wait_for(
-            process.communicate(input=stdin_input),
-            timeout=cli_timeout
+        await asyncio.wait_for(
+            asyncio.gather(*helpers, process.wait()),
+            timeout=deadline - loop.time()
         )
 
         if process.returncode != 0:
-            stderr_text = stderr.decode('utf-8', errors='replace')
+            stderr_text = stderr.strip().decode('utf-8', errors='replace')
             # Try to extract a meaningful error message from stderr
-            error_lines = [l for l in stderr_text.split('\n') if 'error' in l.lower() or 'Error' in l]
-            if error_lines:
-                error_msg = error_lines[0].strip()
+            error_line = _ERROR_LINE_RE.search(stderr)
+            if error_line:
+                error_msg = error_line.group().strip().decode('utf-8', errors='replace')
             else:
                 error_msg = stderr_text[:200] if stderr_text else f"Exit code {process.returncode}"
-            print(f"CLI '{cli_name}' failed with code {process.returncode}: {stderr_text}")
-            return {'error': True, 'content': f"Error: CLI '{cli_name}' failed - {error_msg}"}
+            raise CLIError(
+                f"CLI '{cli_name}' failed - {error_msg}",
+                returncode=process.returncode,
+                stderr=stderr_text
+            )
 
-        # Get output from file or stdout
-        if use_output_file and output_file:
-            with open(output_file.name, 'r') as f:
-                output = f.read().strip()
-        else:
-            output = stdout.decode('utf-8', errors='replace').strip()
-
-        return {
-            'content': output,
-            'reasoning_details': None
-        }
+        if use_output_file:
+            if output_path:
+                output = _read_file_bytes(output_path)
+            text = output.strip().decode('utf-8', errors='replace')
+            if text:
+                yield text
 
     except asyncio.TimeoutError:
-        error_msg = f"CLI '{cli_name}' timed out after {cli_timeout}s"
-        print(error_msg)
-        return {'error': True, 'content': f"Error: {error_msg}"}
+        raise CLIError(f"CLI '{cli_name}' timed out after {cli_timeout}s") from None
+    finally:
+        for task in helpers:
+            task.cancel()
+        try:
+            # Don't leave the CLI running if we timed out, were cancelled, or
+            # the consumer stopped early
+            if process is not None and process.returncode is None:
+                await _stop_cli(process)
+        finally:
+            if output_transport is not None:
+                output_transport.close()
+            for fd in (output_read_fd, output_write_fd):
+                if fd is not None:
+                    os.close(fd)
+            # Clean up temp file
+            if output_path and os.path.exists(output_path):
+                os.unlink(output_path)
+
+
+async def query_cli(
+    cli_name: str,
+    messages: List[Dict[str, str]],
+    timeout: float = 120.0,
+    on_chunk: Optional[Callable[[str], None]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Query a model via local CLI tool.
+
+    Args:
+        cli_name: CLI identifier (e.g., "gemini", "claude", "codex")
+        messages: List of message dicts with 'role' and 'content'
+        timeout: Request timeout in seconds
+        on_chunk: Optional callback invoked with each chunk of output as it arrives
+
+    Returns:
+        Response dict with 'content', or None if failed
+    """
+    # A hit skips spawning the CLI entirely
+    cache_model = f"cli:{cli_name}"
+    cached = await cli_response_cache.get(cache_model, messages)
+    if cached is not None:
+        if on_chunk and cached['content']:
+            on_chunk(cached['content'])
+        return cached
+
+    chunks = []
+    try:
+        async with aclosing(query_cli_stream(cli_name, messages, timeout)) as stream:
+            async for chunk in stream:
+                chunks.append(chunk)
+                if on_chunk:
+                    on_chunk(chunk)
+    except CLIError as e:
+        if e.returncode is not None:
+            logger.error(
+                "CLI '%s' failed with code %s: %s", cli_name, e.returncode, e.stderr,
+                extra={"model": f"cli:{cli_name}", "status": e.returncode}
+            )
+        else:
+            logger.error("%s", e, extra={"model": f"cli:{cli_name}"})
+        return {'error': True, 'content': f"Error: {e}"}
     except Exception as e:
         error_msg = f"Error executing CLI '{cli_name}': {e}"
-        print(error_msg)
+        logger.error("%s", error_msg, extra={"model": f"cli:{cli_name}"})
         return {'error': True, 'content': f"Error: {error_msg}"}
-    finally:
-        # Clean up temp file
-        if output_file and os.path.exists(output_file.name):
-            os.unlink(output_file.name)
+
+    response = {
+        'content': "".join(chunks).strip(),
+        'reasoning_details': None
+    }
+    await cli_response_cache.set(cache_model, messages, response)
+    return response
@@ -0,0 +1,163 @@
+"""Shared HTTP helpers for the API providers."""
+
+import asyncio
+import random
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import httpx
+
+from ..config import MAX_CONCURRENT_REQUESTS_PER_PROVIDER
+
+# Most of an error response body that gets read and logged
+_ERROR_BODY_MAX_BYTES = 4096
+
+# Statuses that are safe and worth retrying: timeouts, rate limits and
+# transient server errors. Other 4xx (auth, validation) fail immediately.
+_RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+# Transport errors raised before the request reached the provider. Read/write
+# timeouts and protocol errors may come after the POST was accepted, so
+# retrying them could bill a completion twice and multiply the timeout.
+_RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+_MAX_ATTEMPTS = 3
+_BACKOFF_INITIAL = 0.3
+_BACKOFF_MAX = 5.0
+# A Retry-After longer than this isn't waited out; the error is returned instead
+_RETRY_AFTER_MAX = 30.0
+# Fail fast on an unreachable provider; the caller's timeout covers the rest
+_CONNECT_TIMEOUT = 10.0
+
+
+def make_client(headers: Dict[str, str]) -> httpx.AsyncClient:
+    """
+    Create a pooled HTTP/2 client for one provider.
+
+    Args:
+        headers: Headers sent with every request (auth, content type)
+
+    Returns:
+        A new client; the caller owns it and must close it
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=MAX_CONCURRENT_REQUESTS_PER_PROVIDER,
+            max_keepalive_connections=MAX_CONCURRENT_REQUESTS_PER_PROVIDER,
+            keepalive_expiry=30
+        ),
+        headers=headers,
+    )
+
+
+class SharedClient:
+    """
+    A provider's client, created on first use and reused by all its queries.
+
+    Repeated queries reuse pooled connections instead of paying a fresh
+    TCP + TLS handshake per request.
+    """
+
+    def __init__(self, headers: Dict[str, str]):
+        self._headers = headers
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def get(self) -> httpx.AsyncClient:
+        """Get the client, creating it on first use."""
+        if self._client is None:
+            self._client = make_client(self._headers)
+        return self._client
+
+    async def aclose(self):
+        """Close the client, if one was created."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def request_timeout(timeout: float) -> httpx.Timeout:
+    """
+    Build a per-request timeout that still fails fast on connect.
+
+    Args:
+        timeout: Read/write/pool timeout in seconds
+
+    Returns:
+        Timeout to pass to client.build_request()
+    """
+    return httpx.Timeout(timeout, connect=_CONNECT_TIMEOUT)
+
+
+async def read_error_body(response: httpx.Response) -> str:
+    """
+    Read the start of a streamed error response without loading all of it.
+
+    Args:
+        response: Response returned by client.send(..., stream=True)
+
+    Returns:
+        Up to the first 4 KiB of the body, decoded as text
+    """
+    head = bytearray()
+    async for chunk in response.aiter_bytes():
+        head.extend(chunk)
+        if len(head) >= _ERROR_BODY_MAX_BYTES:
+            break
+    return head[:_ERROR_BODY_MAX_BYTES].decode('utf-8', errors='replace')
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse a Retry-After header given as seconds or an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+async def send_with_retry(client: httpx.AsyncClient, request: httpx.Request) -> httpx.Response:
+    """
+    Send a request as a stream, retrying transient failures with jittered backoff.
+
+    Failures to connect and 408/429/5xx responses are retried up to 3 attempts,
+    waiting 0.3s, 0.6s, ... (plus up to 1s of jitter, capped at 5s) or the
+    server's Retry-After when it gives one.
+
+    Args:
+        client: Client to send with
+        request: Request built with client.build_request()
+
+    Returns:
+        Streamed response of the last attempt; the caller must close it
+
+    Raises:
+        httpx.TransportError: If the request failed in a way that isn't safe to
+            retry, or the last attempt could not reach the server
+    """
+    for attempt in range(_MAX_ATTEMPTS):
+        last_attempt = attempt == _MAX_ATTEMPTS - 1
+        delay = min(_BACKOFF_MAX, _BACKOFF_INITIAL * 2 ** attempt + random.uniform(0, 1))
+        try:
+            response = await client.send(request, stream=True)
+        except _RETRYABLE_ERRORS:
+            if last_attempt:
+                raise
+        else:
+            if last_attempt or response.status_code not in _RETRYABLE_STATUS:
+                return response
+            retry_after = _retry_after_seconds(response)
+            if retry_after is not None:
+                if retry_after > _RETRY_AFTER_MAX:
+                    return response
+                delay = retry_after
+            await response.aclose()
+        await asyncio.sleep(delay)
@@ -1,14 +1,26 @@
 """OpenAI API client for direct model queries."""
 
-import httpx
+import logging
+
+import orjson
 from typing import List, Dict, Any, Optional
+from .http_utils import SharedClient, read_error_body, request_timeout, send_with_retry
 from ..config import OPENAI_API_KEY, OPENAI_API_URL
 
+logger = logging.getLogger(__name__)
+
+_client = SharedClient({
+    "Authorization": f"Bearer {OPENAI_API_KEY}",
+    "Content-Type": "application/json",
+})
+aclose_client = _client.aclose
+
 
 async def query_openai(
     model: str,
     messages: List[Dict[str, str]],
-    timeout: float = 120.0
+    timeout: float = 120.0,
+    messages_json: Optional[bytes] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Query OpenAI API directly.
@@ -17,44 +29,49 @@ async def query_openai(
         model: Model name (e.g., "gpt-4o", "gpt-4o-mini", "o1")
         messages: List of message dicts with 'role' and 'content'
         timeout: Request timeout in seconds
+        messages_json: Optional messages already encoded as JSON, spliced into the body as-is
 
     Returns:
         Response dict with 'content' and optional 'reasoning_details', or None if failed
     """
     if not OPENAI_API_KEY:
-        print(f"Error: OPENAI_API_KEY not configured")
+        logger.error("OPENAI_API_KEY not configured")
         return None
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
-    payload = {
-        "model": model,
-        "messages": messages,
-    }
+    if messages_json is not None:
+        # Reuse the shared encoding instead of serializing messages again
+        body = b'{"model":' + orjson.dumps(model) + b',"messages":' + messages_json + b'}'
+    else:
+        body = orjson.dumps({
+            "model": model,
+            "messages": messages,
+        })
 
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(
-                OPENAI_API_URL,
-                headers=headers,
-                json=payload
-            )
-            response.raise_for_status()
-
-            data = response.json()
-            message = data['choices'][0]['message']
-
-            return {
-                'content': message.get('content'),
-                'reasoning_details': message.get('reasoning_details')  # For o1 models
-            }
-
-    except httpx.HTTPStatusError as e:
-        print(f"OpenAI API error for {model}: {e.response.status_code} - {e.response.text}")
-        return None
+        client = _client.get()
+        request = client.build_request(
+            "POST", OPENAI_API_URL, content=body, timeout=request_timeout(timeout)
+        )
+        response = await send_with_retry(client, request)
+        try:
+            if not response.is_success:
+                error_text = await read_error_body(response)
+                logger.error(
+                    "OpenAI API error for %s: %s - %s", model, response.status_code, error_text,
+                    extra={"model": model, "status": response.status_code}
+                )
+                return None
+            data = orjson.loads(await response.aread())
+        finally:
+            await response.aclose()
+
+        message = data['choices'][0]['message']
+
+        return {
+            'content': message.get('content'),
+            'reasoning_details': message.get('reasoning_details')  # For o1 models
+        }
+
     except Exception as e:
-        print(f"Error querying OpenAI model {model}: {e}")
+        logger.error("Error querying OpenAI model %s: %s", model, e, extra={"model": model})
         return None
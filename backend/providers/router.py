@@ -10,15 +10,21 @@ Routes model queries to the appropriate API based on model identifier:
 """
 
 import asyncio
-from typing import List, Dict, Any, Optional, Tuple
+import functools
+from contextlib import aclosing
+from typing import List, Dict, Any, Optional, Tuple, Callable, AsyncIterator
 
-from ..config import DIRECT_PROVIDERS
-from .openai_provider import query_openai
-from .anthropic_provider import query_anthropic
-from .openrouter_provider import query_openrouter
+import orjson
+
+from ..config import DIRECT_PROVIDERS, MAX_CONCURRENT_REQUESTS_PER_PROVIDER
+from .openai_provider import query_openai, aclose_client as aclose_openai_client
+from .anthropic_provider import query_anthropic, aclose_client as aclose_anthropic_client
+from .openrouter_provider import query_openrouter, aclose_client as aclose_openrouter_client
 from .cli_provider import query_cli
+from .cache import response_cache
 
 
+@functools.lru_cache(maxsize=1024)
 def parse_model_identifier(model: str) -> Tuple[str, str, str]:
     """
     Parse a model identifier into provider routing info.
@@ -64,7 +70,9 @@ def parse_model_identifier(model: str) -> Tuple[str, str, str]:
 async def query_model(
     model: str,
     messages: List[Dict[str, str]],
-    timeout: float = 120.0
+    timeout: float = 120.0,
+    on_chunk: Optional[Callable[[str], None]] = None,
+    messages_json: Optional[bytes] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Query a model, automatically routing to the appropriate provider.
@@ -73,30 +81,118 @@ async def query_model(
         model: Model identifier (e.g., "openai/gpt-4o", "anthropic/claude-sonnet-4-20250514")
         messages: List of message dicts with 'role' and 'content'
         timeout: Request timeout in seconds
+        on_chunk: Optional callback for partial output (only CLI models stream)
+        messages_json: Optional pre-encoded JSON of messages, reused by providers
+            that send messages unchanged (OpenAI, OpenRouter)
 
     Returns:
         Response dict with 'content' and optional 'reasoning_details', or None if failed
     """
+    # CLI output is cached inside query_cli with its own TTL
+    if model.startswith("cli:"):
+        return await _route_query(model, messages, timeout, on_chunk, messages_json)
+
+    cached = await response_cache.get(model, messages)
+    if cached is not None:
+        if on_chunk and cached.get('content'):
+            on_chunk(cached['content'])
+        return cached
+
+    response = await _route_query(model, messages, timeout, on_chunk, messages_json)
+    await response_cache.set(model, messages, response)
+    return response
+
+
+async def _query_cli_route(model, provider, model_name, messages, timeout, on_chunk, messages_json):
+    return await query_cli(provider, messages, timeout, on_chunk)
+
+
+async def _query_openai_route(model, provider, model_name, messages, timeout, on_chunk, messages_json):
+    return await query_openai(model_name, messages, timeout, messages_json)
+
+
+async def _query_anthropic_route(model, provider, model_name, messages, timeout, on_chunk, messages_json):
+    return await query_anthropic(model_name, messages, timeout)
+
+
+async def _query_openrouter_route(model, provider, model_name, messages, timeout, on_chunk, messages_json):
+    # Reconstruct full model identifier without the "openrouter:" prefix
+    if model.startswith("openrouter:"):
+        model = model[11:]
+    return await query_openrouter(model, messages, timeout, messages_json)
+
+
+# route_to -> semaphore capping concurrent queries, so a large council can't
+# saturate one provider's connection pool or trip its rate limits
+_SEMAPHORES: Dict[str, asyncio.Semaphore] = {}
+
+# route_to -> query function; anything else falls back to OpenRouter
+_DISPATCH = {
+    "cli": _query_cli_route,
+    "openai": _query_openai_route,
+    "anthropic": _query_anthropic_route,
+}
+
+
+async def _route_query(
+    model: str,
+    messages: List[Dict[str, str]],
+    timeout: float,
+    on_chunk: Optional[Callable[[str], None]],
+    messages_json: Optional[bytes]
+) -> Optional[Dict[str, Any]]:
+    """Send a query to the provider the model identifier routes to."""
     route_to, provider, model_name = parse_model_identifier(model)
+    query_fn = _DISPATCH.get(route_to, _query_openrouter_route)
+    semaphore = _SEMAPHORES.get(route_to)
+    if semaphore is None:
+        semaphore = _SEMAPHORES[route_to] = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS_PER_PROVIDER)
+    async with semaphore:
+        return await query_fn(model, provider, model_name, messages, timeout, on_chunk, messages_json)
 
-    if route_to == "cli":
-        return await query_cli(provider, messages, timeout)
-    elif route_to == "openai":
-        return await query_openai(model_name, messages, timeout)
-    elif route_to == "anthropic":
-        return await query_anthropic(model_name, messages, timeout)
-    else:
-        # OpenRouter - reconstruct full model identifier without prefix
-        if model.startswith("openrouter:"):
-            openrouter_model = model[11:]  # Remove "openrouter:" prefix
-        else:
-            openrouter_model = model
-        return await query_openrouter(openrouter_model, messages, timeout)
+
+async def query_models_parallel_stream(
+    models: List[str],
+    messages: List[Dict[str, str]],
+    on_chunk: Optional[Callable[[str, str], None]] = None
+) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+    """
+    Query multiple models in parallel, yielding each response as soon as it arrives.
+
+    Args:
+        models: List of model identifiers
+        messages: List of message dicts to send to each model
+        on_chunk: Optional callback invoked with (model, chunk) for partial output
+
+    Yields:
+        (model, response) tuples in completion order (response is None if failed)
+    """
+    # Every model gets the same messages, so serialize them once
+    messages_json = orjson.dumps(messages)
+    pending = {
+        asyncio.create_task(query_model(
+            model,
+            messages,
+            on_chunk=functools.partial(on_chunk, model) if on_chunk else None,
+            messages_json=messages_json
+        )): model
+        for model in models
+    }
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield pending.pop(task), task.result()
+    finally:
+        # Consumer stopped early or a query raised; don't leave queries running
+        for task in pending:
+            task.cancel()
 
 
 async def query_models_parallel(
     models: List[str],
-    messages: List[Dict[str, str]]
+    messages: List[Dict[str, str]],
+    on_chunk: Optional[Callable[[str, str], None]] = None
 ) -> Dict[str, Optional[Dict[str, Any]]]:
     """
     Query multiple models in parallel, routing each to the appropriate provider.
@@ -104,15 +200,24 @@ async def query_models_parallel(
     Args:
         models: List of model identifiers
         messages: List of message dicts to send to each model
+        on_chunk: Optional callback invoked with (model, chunk) for partial output
 
     Returns:
         Dict mapping model identifier to response dict (or None if failed)
     """
-    # Create tasks for all models
-    tasks = [query_model(model, messages) for model in models]
-
-    # Wait for all to complete
-    responses = await asyncio.gather(*tasks)
-
-    # Map models to their responses
-    return {model: response for model, response in zip(models, responses)}
+    # Keys are laid out in request order up front; responses fill them as they arrive
+    responses: Dict[str, Optional[Dict[str, Any]]] = dict.fromkeys(models)
+    async with aclosing(query_models_parallel_stream(models, messages, on_chunk)) as stream:
+        async for model, response in stream:
+            responses[model] = response
+
+    return responses
+
+
+async def aclose_clients():
+    """Close the persistent HTTP clients held by the API providers."""
+    await asyncio.gather(
+        aclose_openai_client(),
+        aclose_anthropic_client(),
+        aclose_openrouter_client(),
+    )
@@ -2,6 +2,7 @@
 
 import json
 import os
+import tempfile
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from pathlib import Path
@@ -38,9 +39,7 @@ def create_conversation(conversation_id: str) -> Dict[str, Any]:
     }
 
     # Save to file
-    path = get_conversation_path(conversation_id)
-    with open(path, 'w') as f:
-        json.dump(conversation, f, indent=2)
+    save_conversation(conversation)
 
     return conversation
 
@@ -73,9 +72,17 @@ def save_conversation(conversation: Dict[str, Any]):
     """
     ensure_data_dir()
 
+    # Write a temp file and rename it over the original, so readers never see
+    # a truncated or half-written conversation
     path = get_conversation_path(conversation['id'])
-    with open(path, 'w') as f:
-        json.dump(conversation, f, indent=2)
+    fd, tmp_path = tempfile.mkstemp(dir=DATA_DIR, prefix=f".{conversation['id']}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(conversation, f, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
 
 def list_conversations() -> List[Dict[str, Any]]:
@@ -91,15 +98,19 @@ def list_conversations() -> List[Dict[str, Any]]:
     for filename in os.listdir(DATA_DIR):
         if filename.endswith('.json'):
             path = os.path.join(DATA_DIR, filename)
-            with open(path, 'r') as f:
-                data = json.load(f)
-                # Return metadata only
-                conversations.append({
-                    "id": data["id"],
-                    "created_at": data["created_at"],
-                    "title": data.get("title", "New Conversation"),
-                    "message_count": len(data["messages"])
-                })
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                # Deleted since listdir()
+                continue
+            # Return metadata only
+            conversations.append({
+                "id": data["id"],
+                "created_at": data["created_at"],
+                "title": data.get("title", "New Conversation"),
+                "message_count": len(data["messages"])
+            })
 
     # Sort by creation time, newest first
     conversations.sort(key=lambda x: x["created_at"], reverse=True)
@@ -0,0 +1,84 @@
+"""Small shared helpers for the LLM Council backend."""
+
+import logging
+import queue
+import shutil
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# Resolved executable paths. Misses are not stored, so a CLI installed while
+# the server runs is picked up on the next lookup.
+_which_cache: Dict[str, str] = {}
+
+
+def cached_which(command: str) -> Optional[str]:
+    """
+    Resolve a command on PATH, caching successful lookups.
+
+    CLI executables don't move while the server is running, so the PATH walk
+    only needs to happen once per installed command. Commands that aren't
+    found are looked up again on every call.
+
+    Args:
+        command: Executable name (e.g., "gemini")
+
+    Returns:
+        Absolute path to the executable, or None if not found
+    """
+    path = _which_cache.get(command)
+    if path is None:
+        path = shutil.which(command)
+        if path is not None:
+            _which_cache[command] = path
+    return path
+
+
+def peek_which(command: str) -> Optional[str]:
+    """
+    Return the cached path for a command without walking PATH.
+
+    Args:
+        command: Executable name (e.g., "gemini")
+
+    Returns:
+        The cached absolute path, or None if the command hasn't been found yet
+    """
+    return _which_cache.get(command)
+
+
+def forget_which(command: str) -> None:
+    """
+    Drop a cached path that went stale (e.g. the CLI was moved or uninstalled).
+
+    Args:
+        command: Executable name (e.g., "gemini")
+    """
+    _which_cache.pop(command, None)
+
+
+def start_log_listener() -> QueueListener:
+    """
+    Send log records through a queue to a console handler on a background thread.
+
+    Coroutines that log an error only enqueue the record, so a burst of
+    failures (e.g. a provider outage) never blocks the event loop on stderr.
+
+    Returns:
+        The running listener; pass it to stop_log_listener() on shutdown
+    """
+    log_queue = queue.SimpleQueue()
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = QueueListener(log_queue, console, respect_handler_level=True)
+    logging.getLogger().addHandler(QueueHandler(log_queue))
+    listener.start()
+    return listener
+
+
+def stop_log_listener(listener: QueueListener):
+    """Detach the queue handler from the root logger and flush pending records."""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, QueueHandler) and handler.queue is listener.queue:
+            root.removeHandler(handler)
+    listener.stop()
@@ -116,6 +116,23 @@ function App() {
             });
             break;
 
+          case 'stage1_progress':
+            // Append partial output to the model's tab; replaced on stage1_complete
+            setCurrentConversation((prev) => {
+              const messages = [...prev.messages];
+              const lastMsg = messages[messages.length - 1];
+              const stage1 = [...(lastMsg.stage1 || [])];
+              const index = stage1.findIndex((resp) => resp.model === event.model);
+              if (index === -1) {
+                stage1.push({ model: event.model, response: event.data, error: false });
+              } else {
+                stage1[index] = { ...stage1[index], response: stage1[index].response + event.data };
+              }
+              messages[messages.length - 1] = { ...lastMsg, stage1 };
+              return { ...prev, messages };
+            });
+            break;
+
           case 'stage1_complete':
             setCurrentConversation((prev) => {
               const messages = [...prev.messages];
@@ -130,6 +147,7 @@ function App() {
             setCurrentConversation((prev) => {
               const messages = [...prev.messages];
               const lastMsg = messages[messages.length - 1];
+              lastMsg.metadata = event.metadata;
               lastMsg.loading.stage2 = true;
               return { ...prev, messages };
             });